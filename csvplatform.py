@@ -1,22 +1,31 @@
 #Stable/dun move
 import streamlit as st
-import csv
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+import io
 import os
 import sys
-import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from PyPDF2 import PdfReader  # For reading PDF files
 from docx import Document  # For reading .docx files
 import xlrd  # For reading .xls files
 from openpyxl import load_workbook  # For reading .xlsx files
+from pipeline import DEFAULT_PREFETCH, run_pipeline
+from sinks import SINK_FORMATS, available_sink_formats, open_sink
+from textnorm import NormalizedText
 
 # Increase recursion limit
 sys.setrecursionlimit(5000)
 
-# File extraction functions
-def extract_text_from_pdf(pdf_path):
+# File extraction functions (each accepts the file contents as data when already read)
+def _file_source(file_path, data):
+    # Parsers accept either a path or a file-like object
+    return io.BytesIO(data) if data is not None else file_path
+
+def extract_text_from_pdf(pdf_path, data=None):
     try:
         # Attempt extraction with PyPDF2
-        reader = PdfReader(pdf_path)
+        reader = PdfReader(_file_source(pdf_path, data))
         text = ""
         for page in reader.pages:
             text += page.extract_text() + "\n"
@@ -25,38 +34,40 @@ def extract_text_from_pdf(pdf_path):
         st.error(f"Could not read PDF file {pdf_path}: {e}")
         return ""
 
-def extract_text_from_txt(txt_path):
+def extract_text_from_txt(txt_path, data=None):
     try:
+        if data is not None:
+            return data.decode('utf-8')
         with open(txt_path, 'r', encoding='utf-8') as file:
             return file.read()
     except Exception as e:
         st.error(f"Could not read TXT file {txt_path}: {e}")
         return ""
 
-def extract_text_from_docx(docx_path):
+def extract_text_from_docx(docx_path, data=None):
     try:
-        doc = Document(docx_path)
+        doc = Document(_file_source(docx_path, data))
         return "\n".join([paragraph.text for paragraph in doc.paragraphs])
     except Exception as e:
         st.error(f"Could not read DOCX file {docx_path}: {e}")
         return ""
 
-def extract_text_from_xls(xls_path):
+def extract_text_from_xls(xls_path, data=None):
     try:
-        workbook = xlrd.open_workbook(xls_path)
-        data = []
+        workbook = xlrd.open_workbook(xls_path, file_contents=data)
+        rows = []
         for sheet in workbook.sheets():
             for row_idx in range(sheet.nrows):
                 row = sheet.row_values(row_idx)
-                data.append(row)
-        return data
+                rows.append(row)
+        return rows
     except Exception as e:
         st.error(f"Could not read XLS file {xls_path}: {e}")
         return []
 
-def extract_text_from_xlsx(xlsx_path):
+def extract_text_from_xlsx(xlsx_path, data=None):
     try:
-        workbook = load_workbook(xlsx_path, data_only=True)
+        workbook = load_workbook(_file_source(xlsx_path, data), data_only=True)
         text = ""
         for sheet in workbook.sheetnames:
             worksheet = workbook[sheet]
@@ -67,21 +78,26 @@ def extract_text_from_xlsx(xlsx_path):
         st.error(f"Could not read XLSX file {xlsx_path}: {e}")
         return ""
 
-def extract_text(file_path):
+def extract_text(file_path, data=None):
     if file_path.lower().endswith(".pdf"):
-        return extract_text_from_pdf(file_path)
+        return extract_text_from_pdf(file_path, data)
     elif file_path.lower().endswith(".txt"):
-        return extract_text_from_txt(file_path)
+        return extract_text_from_txt(file_path, data)
     elif file_path.lower().endswith(".docx"):
-        return extract_text_from_docx(file_path)
+        return extract_text_from_docx(file_path, data)
     elif file_path.lower().endswith(".xls"):
-        return extract_text_from_xls(file_path)
+        return extract_text_from_xls(file_path, data)
     elif file_path.lower().endswith(".xlsx"):
-        return extract_text_from_xlsx(file_path)
+        return extract_text_from_xlsx(file_path, data)
     else:
         st.error(f"Unsupported file type: {file_path}")
         return ""
 
+def script_thread_executor():
+    # Worker threads share the script's context so st.error calls in the extractors still reach the page
+    ctx = get_script_run_ctx()
+    return ThreadPoolExecutor(initializer=lambda: add_script_run_ctx(threading.current_thread(), ctx))
+
 # Modify the extract_data_from_pdf function to accept meaningless words as a parameter
 def extract_data_from_pdf(text, keywords, behaviors, meaningless_words):
     extracted_data = {}
@@ -121,60 +137,41 @@ def extract_data_from_pdf(text, keywords, behaviors, meaningless_words):
                         values.append(value)
             extracted_data[column] = values if values else ["N/A"]
     else:  # Handle text data (e.g., PDF, TXT, DOCX)
-        lines = text.split("\n")
+        # Lines are split into words only when an extractor reads them
+        doc = NormalizedText(text, meaningless_words)
         for column, keyword in keywords.items():
             behavior = behaviors.get(column, "right")
             values = []  # Collect all matches
-            for i, line in enumerate(lines):
+            seen = set()  # Same contents as values, for constant-time duplicate checks
+            for i, line in enumerate(doc.lines):
                 if keyword in line:
                     if behavior == "right":
                         start_index = line.find(keyword) + len(keyword)
-                        remaining_text = line[start_index:].strip()
-                        # Extract meaningful text until encountering meaningless words
-                        meaningful_text = []
-                        for word in remaining_text.split():
-                            if word in meaningless_words:
-                                continue  # Skip meaningless words
-                            meaningful_text.append(word)
+                        # Extract meaningful text, skipping meaningless words
+                        meaningful_text = doc.words_after(i, start_index)
                         value = " ".join(meaningful_text) if meaningful_text else "N/A"
                     elif behavior == "left":
                         start_index = line.find(keyword)
-                        preceding_text = line[:start_index].strip()
-                        meaningful_text = []
-                        for word in reversed(preceding_text.split()):  # Reverse to check left
-                            if word in meaningless_words:
-                                continue  # Skip meaningless words
-                            meaningful_text.insert(0, word)
+                        meaningful_text = doc.words_before(i, start_index)
                         value = " ".join(meaningful_text) if meaningful_text else "N/A"
                     elif behavior == "below":
-                        for next_line_idx in range(i + 1, len(lines)):
-                            next_line = lines[next_line_idx].strip()
-                            if next_line:
-                                meaningful_text = []
-                                for word in next_line.split():
-                                    if word in meaningless_words:
-                                        continue  # Skip meaningless words
-                                    meaningful_text.append(word)
-                                value = " ".join(meaningful_text) if meaningful_text else "N/A"
-                                if value not in values:  # Avoid duplicates
-                                    values.append(value)
+                        for next_line_idx in range(i + 1, len(doc)):
+                            value = doc.line_value(next_line_idx)
+                            if value is not None and value not in seen:  # Avoid duplicates
+                                seen.add(value)
+                                values.append(value)
                         continue
                     elif behavior == "above":
                         for prev_line_idx in range(i - 1, -1, -1):
-                            prev_line = lines[prev_line_idx].strip()
-                            if prev_line:
-                                meaningful_text = []
-                                for word in prev_line.split():
-                                    if word in meaningless_words:
-                                        continue  # Skip meaningless words
-                                    meaningful_text.append(word)
-                                value = " ".join(meaningful_text) if meaningful_text else "N/A"
-                                if value not in values:  # Avoid duplicates
-                                    values.append(value)
+                            value = doc.line_value(prev_line_idx)
+                            if value is not None and value not in seen:  # Avoid duplicates
+                                seen.add(value)
+                                values.append(value)
                         continue
                     elif behavior == "keyword":
                         value = keyword
-                    if value not in values:  # Avoid duplicates
+                    if value not in seen:  # Avoid duplicates
+                        seen.add(value)
                         values.append(value)
             # Remove meaningless words from the extracted result
             extracted_data[column] = [
@@ -216,62 +213,69 @@ def main():
     )
     meaningless_words = set(word.strip() for word in meaningless_words_input.split(","))
     
-    # Process files and generate CSV
-    if st.button("Generate CSV"):
+    # Output format (arrow is only offered when pyarrow is installed)
+    output_format = st.selectbox("Select output format", available_sink_formats(), index=0)
+    file_extension_out, mime_type = SINK_FORMATS[output_format]
+    output_file_name = "output" + file_extension_out
+    
+    # How many files are read and parsed ahead of extraction
+    prefetch = st.number_input("Prefetch depth", min_value=1, value=DEFAULT_PREFETCH, step=1)
+    
+    # Process files and generate the output file
+    if st.button("Generate output"):
         if uploaded_files:
-            rows = []
-            for uploaded_file in uploaded_files:
-                # Save the uploaded file to a temporary directory
-                file_extension = os.path.splitext(uploaded_file.name)[1]
-                with tempfile.NamedTemporaryFile(delete=False, suffix=file_extension, mode='wb') as temp_file:
-                    temp_file.write(uploaded_file.read())
-                    temp_file_path = temp_file.name
+            # Rows are written as each file completes instead of being collected in memory
+            csv_file_path = os.path.join(os.getcwd(), output_file_name)
+            with open_sink(csv_file_path, column_titles, fmt=output_format) as sink:
+                def extract(uploaded_file, text):
+                    if not text:
+                        st.error(f"Failed to extract text from file: {uploaded_file.name}")
+                        return
                 
-                # Extract text from the temporary file
-                text = extract_text(temp_file_path)
-                if not text:
-                    st.error(f"Failed to extract text from file: {uploaded_file.name}")
-                    continue
+                    # Extract data from the text
+                    extracted_data = extract_data_from_pdf(text, keywords, extraction_behaviors, meaningless_words)
                 
-                # Extract data from the text
-                extracted_data = extract_data_from_pdf(text, keywords, extraction_behaviors, meaningless_words)
-                
-                # Handle dynamic item identification
-                item_rows = []
-                item_counter = 1
-                for column in column_titles:
-                    values = extracted_data.get(column, ["N/A"])
-                    for idx, value in enumerate(values):
-                        if column == "Item":
-                            # Automatically generate item identifiers if not explicitly provided
-                            if idx >= len(item_rows):  # Create a new row if needed
-                                item_identifier = f"Item {item_counter}"
-                                item_rows.append([item_identifier] + ["N/A"] * (len(column_titles) - 1))
-                                item_counter += 1
-                            item_rows[idx][0] = value  # Update the "Item" column
-                        else:
-                            # Ensure the row exists before appending values
-                            if idx >= len(item_rows):
-                                item_rows.append(["N/A"] * len(column_titles))
-                            col_idx = column_titles.index(column)  # Get the correct column index
-                            item_rows[idx][col_idx] = value  # Update the correct column
-            
-                rows.extend(item_rows)
+                    # Handle dynamic item identification
+                    item_rows = []
+                    item_counter = 1
+                    for column in column_titles:
+                        values = extracted_data.get(column, ["N/A"])
+                        for idx, value in enumerate(values):
+                            if column == "Item":
+                                # Automatically generate item identifiers if not explicitly provided
+                                if idx >= len(item_rows):  # Create a new row if needed
+                                    item_identifier = f"Item {item_counter}"
+                                    item_rows.append([item_identifier] + ["N/A"] * (len(column_titles) - 1))
+                                    item_counter += 1
+                                item_rows[idx][0] = value  # Update the "Item" column
+                            else:
+                                # Ensure the row exists before appending values
+                                if idx >= len(item_rows):
+                                    item_rows.append(["N/A"] * len(column_titles))
+                                col_idx = column_titles.index(column)  # Get the correct column index
+                                item_rows[idx][col_idx] = value  # Update the correct column
             
-            # Save to CSV
-            csv_file_path = os.path.join(os.getcwd(), "output.csv")
-            with open(csv_file_path, mode="w", newline="") as csv_file:
-                writer = csv.writer(csv_file)
-                writer.writerow(column_titles)
-                writer.writerows(rows)
+                    sink.write_rows(item_rows)
+                    sink.flush()  # Put this file's rows on disk before moving on
+                
+                # Reading, parsing and extraction of consecutive files overlap
+                with script_thread_executor() as executor:
+                    run_pipeline(
+                        uploaded_files,
+                        read=lambda uploaded_file: uploaded_file.read(),
+                        parse=lambda uploaded_file, data: extract_text(uploaded_file.name, data),
+                        extract=extract,
+                        prefetch=int(prefetch),
+                        executor=executor
+                    )
             
-            # Provide download button for the CSV file
+            # Provide download button for the output file
             with open(csv_file_path, "rb") as f:
                 st.download_button(
-                    label="Download CSV",
+                    label="Download output",
                     data=f.read(),
-                    file_name="output.csv",
-                    mime="text/csv"
+                    file_name=output_file_name,
+                    mime=mime_type
                 )
         else:
             st.error("No files uploaded!")
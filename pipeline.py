@@ -0,0 +1,83 @@
+import asyncio
+
+# Number of files read ahead, and parsed ahead, of the extract stage
+DEFAULT_PREFETCH = 4
+
+# Returned by next() once the items are exhausted
+_DONE = object()
+
+async def _run_stages(items, read, parse, extract, prefetch, executor):
+    loop = asyncio.get_running_loop()
+    # Bounded queues give back-pressure: a full queue pauses the stage feeding it
+    read_queue = asyncio.Queue(maxsize=prefetch)
+    parse_queue = asyncio.Queue(maxsize=prefetch)
+    # Read/parse futures started but not yet awaited by the next stage
+    in_flight = set()
+
+    def start(executor, func, *args):
+        future = loop.run_in_executor(executor, func, *args)
+        in_flight.add(future)
+        return future
+
+    async def finish(future):
+        try:
+            return await future
+        finally:
+            in_flight.discard(future)
+
+    async def read_ahead():
+        iterator = iter(items)
+        # Items are pulled in the thread pool, so a lazy iterable that lists directories
+        # does not block the other stages
+        while (item := await loop.run_in_executor(None, next, iterator, _DONE)) is not _DONE:
+            # Start the read now and queue its future, so reads overlap with parsing
+            await read_queue.put((item, start(None, read, item)))
+        await read_queue.put(None)
+
+    async def parse_stage():
+        while (entry := await read_queue.get()) is not None:
+            item, read_future = entry
+            data = await finish(read_future)
+            await parse_queue.put((item, start(executor, parse, item, data)))
+        await parse_queue.put(None)
+
+    async def extract_stage():
+        # Runs on the caller's thread and in input order
+        while (entry := await parse_queue.get()) is not None:
+            item, parse_future = entry
+            extract(item, await finish(parse_future))
+
+    tasks = [asyncio.ensure_future(stage()) for stage in (read_ahead, parse_stage, extract_stage)]
+    try:
+        await asyncio.gather(*tasks)
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        # After a failure, queued futures are never awaited: cancel them, or retrieve the
+        # outcome of those already finished so asyncio does not log it as unretrieved
+        for future in in_flight:
+            if not future.cancel() and not future.cancelled():
+                future.exception()
+
+def run_pipeline(items, read, parse, extract, prefetch=DEFAULT_PREFETCH, executor=None):
+    """
+    Runs items through read, parse and extract stages that overlap with each other.
+
+    Reads run in a thread pool and parsing runs in `executor`. Each stage queues at most
+    `prefetch` items for the next one and waits when that queue is full, so a slow
+    consumer holds back reading. Extraction runs on the calling thread in input order,
+    so it can write output and call Streamlit directly.
+    An exception raised by any stage stops the pipeline and is re-raised.
+
+    Args:
+        items (iterable): The items to process, e.g. file paths or uploaded files. It is
+            iterated in the thread pool, so it may be a generator that does blocking I/O.
+        read (callable): read(item) -> data. Blocking I/O, such as reading the file bytes.
+        parse (callable): parse(item, data) -> parsed. CPU-heavy work, such as text extraction.
+        extract (callable): extract(item, parsed). Consumes each parsed item.
+        prefetch (int): Maximum number of items queued between two stages.
+        executor (concurrent.futures.Executor): Executor for the parse stage. Uses the
+            event loop's default thread pool when omitted.
+    """
+    asyncio.run(_run_stages(items, read, parse, extract, max(1, prefetch), executor))
@@ -0,0 +1,206 @@
+import csv
+import importlib.util
+import io
+import json
+import os
+
+# Output formats supported by open_sink: format name -> (file extension, MIME type)
+SINK_FORMATS = {
+    "csv": (".csv", "text/csv"),
+    "jsonl": (".jsonl", "application/jsonl"),
+    "arrow": (".arrows", "application/vnd.apache.arrow.stream"),
+}
+
+# Number of rows buffered before they are written, flushed and fsynced
+DEFAULT_FLUSH_EVERY = 100
+
+def sink_format_for_path(path):
+    """
+    Picks the output format from a file extension, falling back to CSV.
+
+    Args:
+        path (str): The path to the output file.
+
+    Returns:
+        str: A key of SINK_FORMATS.
+    """
+    extension = os.path.splitext(path)[1].lower()
+    for fmt, (fmt_extension, _) in SINK_FORMATS.items():
+        if extension == fmt_extension:
+            return fmt
+    return "csv"
+
+def unique_column_names(columns):
+    """
+    Makes column titles usable as keys by suffixing repeated titles with their position.
+
+    Args:
+        columns (list): The column titles, in row order.
+
+    Returns:
+        list: The titles with every repeat renamed to "<title>.<index>", e.g. " .4".
+    """
+    names = []
+    taken = set(columns)
+    seen = set()
+    for idx, column in enumerate(columns):
+        name = column
+        if name in seen:
+            name = f"{column}.{idx}"
+            while name in taken:
+                name += "_"
+        names.append(name)
+        seen.add(name)
+        taken.add(name)
+    return names
+
+def available_sink_formats():
+    """
+    Lists the output formats that can be written with the installed packages.
+
+    Returns:
+        list: Keys of SINK_FORMATS. "arrow" is only included when pyarrow is installed.
+    """
+    return [
+        fmt for fmt in SINK_FORMATS
+        if fmt != "arrow" or importlib.util.find_spec("pyarrow") is not None
+    ]
+
+class RowSink:
+    """
+    Writes rows to an output file incrementally instead of collecting them in memory.
+
+    Rows are buffered and written in batches of `flush_every`. Every batch is
+    written as complete records and then flushed and fsynced, so the file on disk
+    is always a valid prefix of the final output if the run is interrupted.
+    """
+
+    def __init__(self, path, columns, fmt=None, flush_every=DEFAULT_FLUSH_EVERY):
+        """
+        Opens the output file and writes the header.
+
+        Args:
+            path (str): The path to the output file.
+            columns (list): The column titles, in row order.
+            fmt (str): One of SINK_FORMATS. Inferred from the path when omitted.
+            flush_every (int): Number of rows buffered between flushes.
+        """
+        self.path = path
+        self.columns = list(columns)
+        # JSON Lines keys and Arrow field names must be unique; the CSV header keeps the titles as given
+        self.keys = unique_column_names(self.columns)
+        self.format = fmt or sink_format_for_path(path)
+        if self.format not in SINK_FORMATS:
+            raise ValueError(f"Unsupported output format: {self.format}")
+        self.flush_every = max(1, flush_every)
+        self.rows_written = 0
+        self._pending = []
+        self._arrow_writer = None
+
+        if self.format == "arrow":
+            try:
+                import pyarrow  # Optional dependency for the columnar format
+            except ImportError as e:
+                raise ValueError("The 'arrow' output format requires the pyarrow package") from e
+            self._pa = pyarrow
+            # Every column is written as a string, like the CSV output
+            self._schema = pyarrow.schema([(key, pyarrow.string()) for key in self.keys])
+            self._file = open(path, mode="wb")
+            self._arrow_writer = pyarrow.ipc.new_stream(self._file, self._schema)
+        else:
+            self._file = open(path, mode="w", newline="", encoding="utf-8")
+            if self.format == "csv":
+                self._file.write(self._format_csv([self.columns]))
+        self._sync()
+
+    def write_row(self, row):
+        """
+        Queues a single row, flushing once `flush_every` rows are pending.
+
+        Args:
+            row (list): The row values, in the same order as the columns.
+        """
+        self._pending.append(row)
+        if len(self._pending) >= self.flush_every:
+            self.flush()
+
+    def write_rows(self, rows):
+        """
+        Queues several rows.
+
+        Args:
+            rows (list): A list of rows.
+        """
+        for row in rows:
+            self.write_row(row)
+
+    def flush(self):
+        """
+        Writes all pending rows as complete records, then flushes and fsyncs the file.
+        """
+        if not self._pending:
+            return
+        if self.format == "csv":
+            self._file.write(self._format_csv(self._pending))
+        elif self.format == "jsonl":
+            self._file.write("".join(
+                json.dumps(dict(zip(self.keys, row)), ensure_ascii=False) + "\n"
+                for row in self._pending
+            ))
+        else:
+            arrays = [
+                self._pa.array([None if row[idx] is None else str(row[idx]) for row in self._pending],
+                               type=self._pa.string())
+                for idx in range(len(self.columns))
+            ]
+            self._arrow_writer.write_batch(self._pa.record_batch(arrays, schema=self._schema))
+        self.rows_written += len(self._pending)
+        self._pending = []
+        self._sync()
+
+    def close(self):
+        """
+        Flushes any pending rows and closes the output file.
+        """
+        if self._file.closed:
+            return
+        try:
+            self.flush()
+            if self._arrow_writer is not None:
+                self._arrow_writer.close()
+                self._sync()
+        finally:
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        # Keep what was already processed even if the run failed part-way
+        self.close()
+        return False
+
+    def _format_csv(self, rows):
+        # Format the whole batch first so the file only ever receives complete lines
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(rows)
+        return buffer.getvalue()
+
+    def _sync(self):
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+def open_sink(path, columns, fmt=None, flush_every=DEFAULT_FLUSH_EVERY):
+    """
+    Opens a RowSink for writing rows incrementally.
+
+    Args:
+        path (str): The path to the output file.
+        columns (list): The column titles, in row order.
+        fmt (str): One of SINK_FORMATS. Inferred from the path when omitted.
+        flush_every (int): Number of rows buffered between flushes.
+
+    Returns:
+        RowSink: The opened sink. Use it as a context manager to close it.
+    """
+    return RowSink(path, columns, fmt=fmt, flush_every=flush_every)
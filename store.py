@@ -1,4 +1,5 @@
-import csv
+import io
+import logging
 import os
 from AppKit import NSOpenPanel
 import pdfplumber  # For reading PDF files
@@ -6,6 +7,10 @@ import re
 from docx import Document  # For reading .docx files
 import xlrd  # For reading .xls files
 from openpyxl import load_workbook  # For reading .xlsx files
+from pipeline import DEFAULT_PREFETCH, run_pipeline
+from sinks import SINK_FORMATS, open_sink
+
+logger = logging.getLogger(__name__)
 
 def select_files_or_folders():
     """
@@ -24,18 +29,43 @@ def select_files_or_folders():
         return [str(url.path()) for url in panel.URLs()]  # Get the selected paths
     return []  # Return an empty list if the user cancels
 
-def extract_text_from_pdf(pdf_path):
+# File types handled by extract_text
+SUPPORTED_EXTENSIONS = (".pdf", ".txt", ".docx", ".xls", ".xlsx")
+
+def read_file(file_path):
+    """
+    Reads the raw contents of a file.
+
+    Args:
+        file_path (str): The path to the file.
+
+    Returns:
+        bytes: The file contents, or None if the file could not be read.
+    """
+    try:
+        with open(file_path, "rb") as file:
+            return file.read()
+    except OSError:
+        # Leave it to the extractor, which reports the error and returns empty text
+        return None
+
+def _file_source(file_path, data):
+    # Parsers accept either a path or a file-like object
+    return io.BytesIO(data) if data is not None else file_path
+
+def extract_text_from_pdf(pdf_path, data=None):
     """
     Extracts text from a PDF file using pdfplumber.
 
     Args:
         pdf_path (str): The path to the PDF file.
+        data (bytes): The file contents, if already read. The file is read from the path when omitted.
 
     Returns:
         str: The extracted text from the PDF.
     """
     try:
-        with pdfplumber.open(pdf_path) as pdf:
+        with pdfplumber.open(_file_source(pdf_path, data)) as pdf:
             text = ""
             for page in pdf.pages:
                 text += page.extract_text()  # Extract text from each page
@@ -44,52 +74,57 @@ def extract_text_from_pdf(pdf_path):
         print(f"Could not read PDF file {pdf_path}: {e}")
         return ""
 
-def extract_text_from_txt(txt_path):
+def extract_text_from_txt(txt_path, data=None):
     """
     Extracts text from a .txt file.
 
     Args:
         txt_path (str): The path to the .txt file.
+        data (bytes): The file contents, if already read. The file is read from the path when omitted.
 
     Returns:
         str: The extracted text from the .txt file.
     """
     try:
+        if data is not None:
+            return data.decode('utf-8')
         with open(txt_path, 'r', encoding='utf-8') as file:
             return file.read()
     except Exception as e:
         print(f"Could not read TXT file {txt_path}: {e}")
         return ""
 
-def extract_text_from_docx(docx_path):
+def extract_text_from_docx(docx_path, data=None):
     """
     Extracts text from a .docx file.
 
     Args:
         docx_path (str): The path to the .docx file.
+        data (bytes): The file contents, if already read. The file is read from the path when omitted.
 
     Returns:
         str: The extracted text from the .docx file.
     """
     try:
-        doc = Document(docx_path)
+        doc = Document(_file_source(docx_path, data))
         return "\n".join([paragraph.text for paragraph in doc.paragraphs])
     except Exception as e:
         print(f"Could not read DOCX file {docx_path}: {e}")
         return ""
 
-def extract_text_from_xls(xls_path):
+def extract_text_from_xls(xls_path, data=None):
     """
     Extracts text from an .xls file using xlrd.
 
     Args:
         xls_path (str): The path to the .xls file.
+        data (bytes): The file contents, if already read. The file is read from the path when omitted.
 
     Returns:
         str: The extracted text from the .xls file.
     """
     try:
-        workbook = xlrd.open_workbook(xls_path)
+        workbook = xlrd.open_workbook(xls_path, file_contents=data)
         text = ""
         for sheet in workbook.sheets():
             for row_idx in range(sheet.nrows):
@@ -100,18 +135,19 @@ def extract_text_from_xls(xls_path):
         print(f"Could not read XLS file {xls_path}: {e}")
         return ""
 
-def extract_text_from_xlsx(xlsx_path):
+def extract_text_from_xlsx(xlsx_path, data=None):
     """
     Extracts text from an .xlsx file using openpyxl.
 
     Args:
         xlsx_path (str): The path to the .xlsx file.
+        data (bytes): The file contents, if already read. The file is read from the path when omitted.
 
     Returns:
         str: The extracted text from the .xlsx file.
     """
     try:
-        workbook = load_workbook(xlsx_path, data_only=True)
+        workbook = load_workbook(_file_source(xlsx_path, data), data_only=True)
         text = ""
         for sheet in workbook.sheetnames:
             worksheet = workbook[sheet]
@@ -122,26 +158,27 @@ def extract_text_from_xlsx(xlsx_path):
         print(f"Could not read XLSX file {xlsx_path}: {e}")
         return ""
 
-def extract_text(file_path):
+def extract_text(file_path, data=None):
     """
     Extracts text from a file based on its type.
 
     Args:
         file_path (str): The path to the file.
+        data (bytes): The file contents, if already read. The file is read from the path when omitted.
 
     Returns:
         str: The extracted text from the file.
     """
     if file_path.lower().endswith(".pdf"):
-        return extract_text_from_pdf(file_path)
+        return extract_text_from_pdf(file_path, data)
     elif file_path.lower().endswith(".txt"):
-        return extract_text_from_txt(file_path)
+        return extract_text_from_txt(file_path, data)
     elif file_path.lower().endswith(".docx"):
-        return extract_text_from_docx(file_path)
+        return extract_text_from_docx(file_path, data)
     elif file_path.lower().endswith(".xls"):
-        return extract_text_from_xls(file_path)
+        return extract_text_from_xls(file_path, data)
     elif file_path.lower().endswith(".xlsx"):
-        return extract_text_from_xlsx(file_path)
+        return extract_text_from_xlsx(file_path, data)
     else:
         print(f"Unsupported file type: {file_path}")
         return ""
@@ -202,7 +239,7 @@ def extract_data_from_pdf(text, keywords):
     """
     # Normalize the text by removing extra spaces and newlines
     normalized_text = " ".join(text.split())
-    print(f"Normalized text:\n{normalized_text}")  # Debug: Print the normalized text
+    logger.debug("Normalized text:\n%s", normalized_text)  # Debug: Log the normalized text
 
     extracted_data = {}
     for column, keyword in keywords.items():
@@ -226,7 +263,7 @@ def extract_data_from_pdf(text, keywords):
             extracted_data[column] = "N/A"
     return extracted_data
 
-def process_columns_and_generate_csv(column_titles, keywords, references, extraction_sources, csv_file_path):
+def process_columns_and_generate_csv(column_titles, keywords, references, extraction_sources, csv_file_path, prefetch=DEFAULT_PREFETCH):
     """
     Processes the selected files for each column and generates a CSV file with extracted data.
 
@@ -235,67 +272,140 @@ def process_columns_and_generate_csv(column_titles, keywords, references, extrac
         keywords (dict): A dictionary mapping column titles to keywords.
         references (dict): A dictionary mapping column titles to their selected files/folders.
         extraction_sources (dict): A dictionary mapping column titles to their extraction source (title or content).
-        csv_file_path (str): The path to the output CSV file.
+        csv_file_path (str): The path to the output file. A .jsonl or .arrows extension selects that format.
+        prefetch (int): How many files are read and parsed ahead of extraction.
+    """
+    # Extraction errors propagate; only failures to write the output file are reported here
+    try:
+        # Rows are written as each file completes, so an interrupted run keeps its progress
+        with open_sink(csv_file_path, column_titles) as sink:
+            _process_columns(column_titles, keywords, references, extraction_sources, sink, prefetch)
+    except OSError as e:
+        print(f"An error occurred while writing to the output file {csv_file_path}: {e}")
+        return
+    print(f"Output file created successfully at {csv_file_path}")
+
+def _iter_reference_files(column_references):
+    """
+    Yields the selected files, and the files directly inside the selected folders.
+
+    Args:
+        column_references (list): The selected files/folders of a column.
+
+    Yields:
+        str: A file path.
     """
-    rows = []
+    for path in column_references:
+        if os.path.isfile(path):
+            yield path
+        elif os.path.isdir(path):
+            items = os.listdir(path)
+            for item in items:
+                item_path = os.path.join(path, item)
+                if os.path.isfile(item_path):
+                    yield item_path
+
+def _iter_selected_files(column_titles, references):
+    """
+    Yields every selected file once, with the columns that reference it.
+
+    A file is referenced by a column that selected it directly or selected the folder
+    containing it. This runs inside the pipeline's read-ahead stage, so folders are
+    listed in the thread pool while earlier files are already being read and parsed.
+
+    Args:
+        column_titles (list): A list of column titles.
+        references (dict): A dictionary mapping column titles to their selected files/folders.
 
-    # Process each column independently
+    Yields:
+        tuple: The file path and the list of column titles referencing it, in column order.
+    """
+    selected = {
+        column: {os.path.normpath(path) for path in references[column]}
+        for column in column_titles
+    }
+    seen = set()
     for column in column_titles:
-        column_keyword = keywords[column]
-        column_references = references[column]
-        extraction_source = extraction_sources[column]
-
-        for path in column_references:
-            if os.path.isfile(path):
-                if extraction_source == "title":
-                    # Directly use the file title as the extracted result
-                    file_name = os.path.basename(path)
-                    value = file_name  # Use the full file name as the value
-                else:
-                    # Extract from the file content
-                    text = extract_text(path)
-                    extracted_data = extract_data_from_pdf(text, {column: column_keyword})
-                    value = extracted_data[column] if column in extracted_data else "N/A"
-
-                row = [value if col == column else "N/A" for col in column_titles]
-                rows.append(row)
-            elif os.path.isdir(path):
-                items = os.listdir(path)
-                for item in items:
-                    item_path = os.path.join(path, item)
-                    if os.path.isfile(item_path):
-                        if extraction_source == "title":
-                            # Directly use the file title as the extracted result
-                            file_name = os.path.basename(item_path)
-                            value = file_name  # Use the full file name as the value
-                        else:
-                            # Extract from the file content
-                            text = extract_text(item_path)
-                            extracted_data = extract_data_from_pdf(text, {column: column_keyword})
-                            value = extracted_data[column] if column in extracted_data else "N/A"
-
-                        row = [value if col == column else "N/A" for col in column_titles]
-                        rows.append(row)
-
-    # Write the rows to the CSV file
-    try:
-        with open(csv_file_path, mode="w", newline="") as csv_file:
-            writer = csv.writer(csv_file)
-            writer.writerow(column_titles)  # Write the header row
-            writer.writerows(rows)  # Write the data rows
-        print(f"CSV file created successfully at {csv_file_path}")
-    except Exception as e:
-        print(f"An error occurred while writing to the CSV file: {e}")
+        for path in _iter_reference_files(references[column]):
+            key = os.path.normpath(path)
+            if key in seen:
+                continue
+            seen.add(key)
+            parent = os.path.dirname(key)
+            yield path, [
+                col for col in column_titles
+                if key in selected[col] or parent in selected[col]
+            ]
+
+def _process_columns(column_titles, keywords, references, extraction_sources, sink, prefetch):
+    """
+    Extracts a row for every selected file and column and writes it to the sink.
+
+    Each file is read and parsed once, even when several columns reference it, and its
+    rows are written together as soon as it completes.
+
+    Args:
+        column_titles (list): A list of column titles.
+        keywords (dict): A dictionary mapping column titles to keywords.
+        references (dict): A dictionary mapping column titles to their selected files/folders.
+        extraction_sources (dict): A dictionary mapping column titles to their extraction source (title or content).
+        sink (RowSink): The sink receiving the rows.
+        prefetch (int): How many files are read and parsed ahead of extraction.
+    """
+    def needs_content(columns):
+        return any(extraction_sources[column] != "title" for column in columns)
+
+    def read(item):
+        path, columns = item
+        # Title-only files and unsupported file types are never opened
+        if not needs_content(columns) or not path.lower().endswith(SUPPORTED_EXTENSIONS):
+            return None
+        return read_file(path)
+
+    def parse(item, data):
+        path, columns = item
+        if not needs_content(columns):
+            return None
+        # For unsupported types this only reports the file as unsupported
+        return extract_text(path, data)
+
+    def extract(item, text):
+        path, columns = item
+        content_keywords = {
+            column: keywords[column] for column in columns
+            if extraction_sources[column] != "title"
+        }
+        # Extract from the file content once for all content columns
+        extracted_data = extract_data_from_pdf(text, content_keywords) if content_keywords else {}
+        for column in columns:
+            if extraction_sources[column] == "title":
+                # Directly use the file title as the extracted result
+                value = os.path.basename(path)  # Use the full file name as the value
+            else:
+                value = extracted_data[column] if column in extracted_data else "N/A"
+            row = [value if col == column else "N/A" for col in column_titles]
+            sink.write_row(row)
+        sink.flush()  # Put this file's rows on disk before moving on
+
+    # Listing, reading, parsing and extraction of consecutive files overlap
+    run_pipeline(
+        _iter_selected_files(column_titles, references),
+        read=read,
+        parse=parse,
+        extract=extract,
+        prefetch=prefetch
+    )
 
 def generate_csv():
     # Get the desktop path
     desktop_path = os.path.expanduser("~/Desktop")
     
-    # Prompt the user for the CSV file name
-    csv_file_name = input("Enter the name of the CSV file (e.g., output.csv): ").strip()
+    # Prompt the user for the output file name; the extension selects the format
+    csv_file_name = input("Enter the name of the output file (e.g., output.csv, output.jsonl or output.arrows): ").strip()
     
-    # Ensure the file name ends with .csv
-    if not csv_file_name.lower().endswith(".csv"):
+    # Ensure the file name ends with a supported extension, defaulting to .csv
+    output_extensions = tuple(extension for extension, _ in SINK_FORMATS.values())
+    if not csv_file_name.lower().endswith(output_extensions):
         csv_file_name += ".csv"
     
     # Combine the desktop path with the file name
@@ -0,0 +1,66 @@
+import random
+
+from textnorm import NormalizedText
+
+def _baseline_meaningful_words(text, meaningless_words):
+    # The word loop csvplatform.extract_data_from_pdf used before NormalizedText
+    meaningful_text = []
+    for word in text.strip().split():
+        if word in meaningless_words:
+            continue
+        meaningful_text.append(word)
+    return meaningful_text
+
+def _baseline_line_value(line, meaningless_words):
+    next_line = line.strip()
+    if not next_line:
+        return None
+    meaningful_text = _baseline_meaningful_words(next_line, meaningless_words)
+    return " ".join(meaningful_text) if meaningful_text else "N/A"
+
+def test_words_after_keyword_at_token_boundaries():
+    doc = NormalizedText("Qty: 3 pcs\nUnitQty5 the box\nQty", {"the"})
+    # Keyword followed by a separator inside the same token
+    assert doc.words_after(0, len("Qty")) == [":", "3", "pcs"]
+    # Keyword ending inside a token keeps the rest of that token
+    assert doc.words_after(1, len("UnitQty")) == ["5", "box"]
+    # Keyword at the end of the line
+    assert doc.words_after(2, len("Qty")) == []
+
+def test_words_before_keyword_at_token_boundaries():
+    doc = NormalizedText("the total 12.50Amount\nprice  Amount", {"the"})
+    # Keyword starting inside a token keeps the head of that token
+    assert doc.words_before(0, len("the total 12.50")) == ["total", "12.50"]
+    # Keyword preceded by a run of whitespace
+    assert doc.words_before(1, len("price  ")) == ["price"]
+    # Keyword at the start of the line
+    assert doc.words_before(1, 0) == []
+
+def test_cut_token_that_is_a_stop_word_is_dropped():
+    doc = NormalizedText("keyof value", {"of"})
+    assert doc.words_after(0, len("key")) == ["value"]
+
+def test_line_value_blank_and_stop_word_lines():
+    doc = NormalizedText("a of b\n   \t\nof of\n", {"of"})
+    assert doc.line_value(0) == "a b"
+    assert doc.line_value(1) is None
+    assert doc.line_value(2) == "N/A"
+    assert doc.line_value(3) is None
+    assert len(doc) == 4
+
+def test_matches_baseline_word_loop_on_random_lines():
+    rng = random.Random(1)
+    alphabet = ["a", "b", "ab", ":", "x:", " ", "  ", "\t", "　", "\xa0", "Qty", "the"]
+    stop_sets = [set(), {"a"}, {"the", ":"}, {"ab", "b", ""}]
+    for _ in range(5000):
+        text = "\n".join(
+            "".join(rng.choice(alphabet) for _ in range(rng.randint(0, 12)))
+            for _ in range(rng.randint(1, 4))
+        )
+        stop_words = rng.choice(stop_sets)
+        doc = NormalizedText(text, stop_words)
+        for line_idx, line in enumerate(text.split("\n")):
+            assert doc.line_value(line_idx) == _baseline_line_value(line, stop_words)
+            for char_pos in range(len(line) + 1):
+                assert doc.words_after(line_idx, char_pos) == _baseline_meaningful_words(line[char_pos:], stop_words)
+                assert doc.words_before(line_idx, char_pos) == _baseline_meaningful_words(line[:char_pos], stop_words)
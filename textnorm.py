@@ -0,0 +1,90 @@
+from itertools import filterfalse
+
+# Marks a line whose value has not been computed yet
+_UNSET = object()
+
+class NormalizedText:
+    """
+    A document split into lines once, with stop-word filtering done on demand.
+
+    Lines are only split into words (with str.split) when an extractor reads them, and
+    stop words are dropped with a single filterfalse pass over those words. The
+    filtered value of each line is cached, so below/above scans over many matches
+    split every line at most once.
+    """
+
+    def __init__(self, text, stop_words):
+        """
+        Splits the document into lines.
+
+        Args:
+            text (str): The extracted text from the file.
+            stop_words (set): The words to drop from extracted values.
+        """
+        self.lines = text.split("\n")
+        self.stop_words = stop_words
+        self._line_values = None
+
+    def __len__(self):
+        return len(self.lines)
+
+    def meaningful_words(self, text):
+        """
+        Splits text into words and drops the stop words.
+
+        Args:
+            text (str): A line or part of a line.
+
+        Returns:
+            list: The remaining words, in order.
+        """
+        return list(filterfalse(self.stop_words.__contains__, text.split()))
+
+    def words_after(self, line_idx, char_pos):
+        """
+        Returns the meaningful words of `line[char_pos:]`.
+
+        Args:
+            line_idx (int): The line index.
+            char_pos (int): The character offset within the line.
+
+        Returns:
+            list: The remaining words, in order.
+        """
+        return self.meaningful_words(self.lines[line_idx][char_pos:])
+
+    def words_before(self, line_idx, char_pos):
+        """
+        Returns the meaningful words of `line[:char_pos]`.
+
+        Args:
+            line_idx (int): The line index.
+            char_pos (int): The character offset within the line.
+
+        Returns:
+            list: The remaining words, in order.
+        """
+        return self.meaningful_words(self.lines[line_idx][:char_pos])
+
+    def line_value(self, line_idx):
+        """
+        Returns the meaningful words of a whole line joined by spaces.
+
+        Args:
+            line_idx (int): The line index.
+
+        Returns:
+            str: The joined words, "N/A" if every word is a stop word, or None for a blank line.
+        """
+        if self._line_values is None:
+            self._line_values = [_UNSET] * len(self.lines)
+        value = self._line_values[line_idx]
+        if value is _UNSET:
+            words = self.lines[line_idx].split()
+            if words:
+                meaningful_text = list(filterfalse(self.stop_words.__contains__, words))
+                value = " ".join(meaningful_text) if meaningful_text else "N/A"
+            else:
+                value = None  # Blank line
+            self._line_values[line_idx] = value
+        return value
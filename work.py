@@ -1,9 +1,11 @@
 import streamlit as st
 import pdfplumber
-import csv
 from datetime import datetime
 import re
 import io
+import os
+from pipeline import DEFAULT_PREFETCH, run_pipeline
+from sinks import SINK_FORMATS, available_sink_formats, open_sink
 
 # Define extraction functions (from pdfidentifier(test).py)
 def extract_location(text):
@@ -36,6 +38,11 @@ def extract_estimated_cost(text):
         return match.group(1)
     return None
 
+def extract_page_texts(uploaded_file, data):
+    # Parse stage: the CPU-heavy PDF text extraction, run off the script thread
+    with pdfplumber.open(io.BytesIO(data)) as pdf:
+        return [page.extract_text() for page in pdf.pages]
+
 # Streamlit UI
 st.title("PDF Identifier and CSV Generator")
 
@@ -48,19 +55,26 @@ identifier = "DATE日期："
 # CSV columns
 csv_columns = ["File Path", "接CALL時間", " ", "地點", " ", "跟進事項", " ", "W.O. REF. 工作單號碼：", " ", "ESTIMATED COST 估計費用"]
 
+# Output format (arrow is only offered when pyarrow is installed)
+output_format = st.selectbox("Select output format", available_sink_formats(), index=0)
+output_extension, output_mime = SINK_FORMATS[output_format]
+
+# How many PDFs are read and parsed ahead of extraction
+prefetch = st.number_input("Prefetch depth", min_value=1, value=DEFAULT_PREFETCH, step=1)
+
 # Process files when the user clicks the button
 if st.button("Process PDFs"):
     if uploaded_files:
-        rows_to_write = []
-        for uploaded_file in uploaded_files:
-            with pdfplumber.open(uploaded_file) as pdf:
+        # Rows are written to disk as each PDF completes, so an interrupted run leaves a partial output here
+        output_path = os.path.join(os.getcwd(), "output" + output_extension)
+        with open_sink(output_path, csv_columns, fmt=output_format) as sink:
+            def extract_row(uploaded_file, page_texts):
                 extracted_date = None
                 location = None
                 follow_up_action = None
                 work_order_ref = None
                 estimated_cost = None
-                for page in pdf.pages:
-                    text = page.extract_text()
+                for text in page_texts:
                     #st.text(f"Extracted text from page:\n{text}")  # Debug: Print extracted text
 
                     # Extract data
@@ -77,7 +91,7 @@ if st.button("Process PDFs"):
                     try:
                         parsed_date = datetime.strptime(extracted_date, "%d-%b-%Y")
                         formatted_date = parsed_date.strftime("%-d/%-m/%Y")
-                        rows_to_write.append([
+                        sink.write_row([
                             uploaded_file.name,
                             formatted_date,
                             "",
@@ -89,24 +103,30 @@ if st.button("Process PDFs"):
                             "",
                             estimated_cost or ""
                         ])
+                        sink.flush()  # Put this PDF's row on disk before moving on
                     except ValueError as e:
                         st.error(f"Error parsing date in file {uploaded_file.name}: {e}")
 
-        # Write rows to a CSV in memory
-        if rows_to_write:
-            output = io.StringIO()
-            writer = csv.writer(output)
-            writer.writerow(csv_columns)
-            writer.writerows(rows_to_write)
-            st.success("PDFs processed successfully!")
+            # Reading, parsing and extraction of consecutive PDFs overlap
+            run_pipeline(
+                uploaded_files,
+                read=lambda uploaded_file: uploaded_file.getvalue(),
+                parse=extract_page_texts,
+                extract=extract_row,
+                prefetch=int(prefetch)
+            )
+
+        if sink.rows_written:
+            st.success(f"PDFs processed successfully! Output saved to {output_path}")
 
             # Provide a download button
-            st.download_button(
-                label="Download CSV",
-                data=output.getvalue(),
-                file_name="output.csv",
-                mime="text/csv"
-            )
+            with open(output_path, "rb") as f:
+                st.download_button(
+                    label="Download output",
+                    data=f,
+                    file_name="output" + output_extension,
+                    mime=output_mime
+                )
         else:
             st.warning("No valid data found in the uploaded PDFs.")
     else: